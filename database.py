@@ -5,7 +5,7 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
@@ -22,11 +22,11 @@ database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    _client = AsyncIOMotorClient(database_url)
     db = _client[database_name]
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -40,16 +40,77 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
+async def create_documents(collection_name: str, docs: list):
+    """Insert multiple documents with timestamps in a single round-trip"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    now = datetime.now(timezone.utc)
+    prepared = []
+    for doc in docs:
+        data_dict = doc.model_dump() if isinstance(doc, BaseModel) else doc.copy()
+        data_dict['created_at'] = now
+        data_dict['updated_at'] = now
+        prepared.append(data_dict)
+
+    result = await db[collection_name].insert_many(prepared, ordered=False)
+    return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+# Case-insensitive collation so equality filters can use B-tree indexes
+# instead of anchored "i"-flag regexes that force a full scan
+CASE_INSENSITIVE = {"locale": "en", "strength": 2}
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None,
+                  projection: dict = None, sort: list = None, collation: dict = None):
     """Get documents from collection"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
-    
-    cursor = db[collection_name].find(filter_dict or {})
+
+    cursor = db[collection_name].find(filter_dict or {}, projection)
+    if collation:
+        cursor = cursor.collation(collation)
+    if sort:
+        cursor = cursor.sort(sort)
     if limit:
         cursor = cursor.limit(limit)
-    
-    return list(cursor)
+
+    return await cursor.to_list(length=limit)
+
+def aggregate_cursor(collection_name: str, pipeline: list, collation: dict = None):
+    """Return an aggregation cursor for incremental (streaming) iteration"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    kwargs = {"collation": collation} if collation else {}
+    return db[collection_name].aggregate(pipeline, **kwargs)
+
+async def aggregate_documents(collection_name: str, pipeline: list, limit: int = None,
+                              collation: dict = None):
+    """Run an aggregation pipeline and return the resulting documents"""
+    cursor = aggregate_cursor(collection_name, pipeline, collation=collation)
+    return await cursor.to_list(length=limit)
+
+async def ensure_indexes():
+    """Create the indexes the API queries rely on (no-op if they already exist)"""
+    if db is None:
+        return
+
+    # Weighted text index backing the free-text search in GET /places
+    await db["place"].create_index(
+        [("name", "text"), ("city", "text"), ("state", "text"),
+         ("category", "text"), ("tags", "text")],
+        weights={"name": 10, "city": 5, "state": 5, "category": 3, "tags": 2},
+        name="place_text_idx",
+    )
+
+    # Single-field indexes with case-insensitive collation for exact filters
+    for field in ("category", "state", "city"):
+        await db["place"].create_index([(field, 1)], collation=CASE_INSENSITIVE)
+
+    # Compound indexes for the common combined filters, so Mongo can satisfy
+    # both predicates from one index instead of filtering in memory
+    await db["place"].create_index([("category", 1), ("state", 1)], collation=CASE_INSENSITIVE)
+    await db["place"].create_index([("city", 1), ("state", 1)], collation=CASE_INSENSITIVE)
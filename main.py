@@ -1,172 +1,313 @@
+import hashlib
+import logging
 import os
-from typing import List, Optional
+import re
+import time
+from functools import lru_cache
+from typing import Optional
+
+import orjson
+from bson import ObjectId
 from fastapi import FastAPI, HTTPException, Query
+from pymongo.errors import PyMongoError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
 
-from database import create_document, get_documents, db
+from database import create_document, create_documents, aggregate_cursor, ensure_indexes, db, CASE_INSENSITIVE
 from schemas import Place
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+# Near-static GET endpoints worth caching, and how long entries stay fresh.
+# /places is deliberately not cached: the middleware would have to buffer the
+# full body, which defeats its streaming response, and its q-keyed variants
+# had the worst hit rate anyway.
+#
+# The cache is per-process, so under multi-worker gunicorn each worker fills
+# and expires its own copy independently. That's acceptable here: the cached
+# payloads ("/" and "/schema") are fixed at deploy time, so workers can never
+# disagree on content, only on when they cached it. Anything mutable belongs
+# in a shared backend (e.g. Redis), not in this dict.
+CACHE_TTL = 60
+CACHE_MAX_ENTRIES = 256
+CACHED_PATHS = {"/", "/schema"}
+_response_cache: dict = {}
+
+def _cache_store(key, entry):
+    """Insert a cache entry, sweeping expired keys and capping total size.
+
+    q is arbitrary user text, so without a bound every distinct query
+    string would pin a response body in memory for the worker's lifetime.
+    """
+    now = time.time()
+    for k in [k for k, v in _response_cache.items() if v[0] <= now]:
+        del _response_cache[k]
+    while len(_response_cache) >= CACHE_MAX_ENTRIES:
+        # dicts iterate in insertion order, so this evicts the oldest entry
+        del _response_cache[next(iter(_response_cache))]
+    _response_cache[key] = entry
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """Cache responses for near-static GET endpoints and answer conditional requests with 304"""
+
+    async def dispatch(self, request, call_next):
+        path = request.url.path
+        if request.method != "GET" or path not in CACHED_PATHS:
+            return await call_next(request)
+
+        # Key on the sorted query params so ?q=x&limit=10 == ?limit=10&q=x
+        key = (path, tuple(sorted(request.query_params.multi_items())))
+        cached = _response_cache.get(key)
+        if cached and cached[0] > time.time():
+            _, body, content_type, etag = cached
+        else:
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            content_type = response.headers.get("content-type", "application/json")
+            # Keep a handler-provided ETag (e.g. /schema's precomputed one)
+            # instead of shadowing it with a second, different value
+            etag = response.headers.get("etag") or f'"{hashlib.md5(body).hexdigest()}"'
+            _cache_store(key, (time.time() + CACHE_TTL, body, content_type, etag))
+
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"max-age={CACHE_TTL}, stale-while-revalidate=30",
+        }
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=content_type, headers=headers)
+
+# Seed data for /places/seed, built once at import time so the handler
+# just references the already-allocated tuple
+_SAMPLE_PLACES: tuple = (
+    {
+        "name": "Brandenburg Gate",
+        "city": "Berlin",
+        "state": "Berlin",
+        "category": "landmark",
+        "description": "18th-century neoclassical monument and iconic symbol of Berlin.",
+        "tags": ["history", "architecture", "city"],
+        "latitude": 52.516275, "longitude": 13.377704,
+        "website": "https://www.visitberlin.de/en/brandenburg-gate"
+    },
+    {
+        "name": "Neuschwanstein Castle",
+        "city": "Schwangau",
+        "state": "Bavaria",
+        "category": "castle",
+        "description": "Fairy-tale 19th-century Romanesque Revival castle commissioned by King Ludwig II.",
+        "tags": ["castle", "mountains", "romantic road"],
+        "latitude": 47.5576, "longitude": 10.7498,
+        "website": "https://www.neuschwanstein.de/englisch/tourist/index.htm"
+    },
+    {
+        "name": "Cologne Cathedral",
+        "city": "Cologne",
+        "state": "North Rhine-Westphalia",
+        "category": "cathedral",
+        "description": "UNESCO-listed Gothic cathedral with twin spires and a rich history.",
+        "tags": ["unesco", "gothic", "church"],
+        "latitude": 50.9413, "longitude": 6.9583,
+        "website": "https://www.koelner-dom.de/"
+    },
+    {
+        "name": "Miniatur Wunderland",
+        "city": "Hamburg",
+        "state": "Hamburg",
+        "category": "museum",
+        "description": "World's largest model railway exhibition with intricate miniature worlds.",
+        "tags": ["museum", "family", "model"],
+        "latitude": 53.5437, "longitude": 9.9884,
+        "website": "https://www.miniatur-wunderland.com/"
+    },
+    {
+        "name": "Black Forest",
+        "city": "",
+        "state": "Baden-Württemberg",
+        "category": "nature",
+        "description": "Mountainous region known for dense forests, cuckoo clocks, and scenic trails.",
+        "tags": ["hiking", "nature", "scenic"],
+        "latitude": 48.1430, "longitude": 8.2096,
+        "website": "https://www.schwarzwald-tourismus.info/"
+    },
+    {
+        "name": "Heidelberg Castle",
+        "city": "Heidelberg",
+        "state": "Baden-Württemberg",
+        "category": "castle",
+        "description": "Picturesque Renaissance castle ruins overlooking the old town.",
+        "tags": ["castle", "ruins", "river"],
+        "latitude": 49.4106, "longitude": 8.7153,
+        "website": "https://www.schloss-heidelberg.de/"
+    },
+    {
+        "name": "Zugspitze",
+        "city": "Garmisch-Partenkirchen",
+        "state": "Bavaria",
+        "category": "mountain",
+        "description": "Germany's highest peak with panoramic views and year-round activities.",
+        "tags": ["alps", "skiing", "views"],
+        "latitude": 47.4210, "longitude": 10.9840,
+        "website": "https://zugspitze.de/"
+    },
+    {
+        "name": "Museum Island",
+        "city": "Berlin",
+        "state": "Berlin",
+        "category": "museum",
+        "description": "UNESCO ensemble of five world-renowned museums on the Spree.",
+        "tags": ["unesco", "art", "history"],
+        "latitude": 52.5211, "longitude": 13.3969,
+        "website": "https://www.smb.museum/en/museums-institutions/museum-island-berlin/home/"
+    },
+    {
+        "name": "Sanssouci Palace",
+        "city": "Potsdam",
+        "state": "Brandenburg",
+        "category": "palace",
+        "description": "Rococo summer palace of Frederick the Great with terraced gardens.",
+        "tags": ["palace", "gardens", "rococo"],
+        "latitude": 52.4036, "longitude": 13.0397,
+        "website": "https://www.spsg.de/"
+    },
+    {
+        "name": "Saxon Switzerland National Park",
+        "city": "",
+        "state": "Saxony",
+        "category": "nature",
+        "description": "Dramatic sandstone formations and hiking trails along the Elbe.",
+        "tags": ["national park", "hiking", "sandstone"],
+        "latitude": 50.9289, "longitude": 14.2366,
+        "website": "https://www.saechsische-schweiz.de/en/"
+    }
+)
+
+def _orjson_default(obj):
+    """Fallback encoder for BSON types orjson doesn't know natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError
+
+class BSONJSONResponse(ORJSONResponse):
+    """ORJSONResponse that can encode ObjectId straight from the C encoder"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_orjson_default)
+
+app = FastAPI(default_response_class=BSONJSONResponse)
+
+app.add_middleware(ResponseCacheMiddleware)
+
+# Added after the cache middleware so it wraps it: cached bodies are stored
+# uncompressed and compressed per-request based on Accept-Encoding
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=5)
+
+@app.on_event("startup")
+async def create_indexes():
+    if db is None:
+        return
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        # The app deliberately degrades gracefully when Mongo is unreachable
+        # (every handler guards db, and /test diagnoses the connection), so a
+        # failed index build must not stop the service from booting. This
+        # doesn't silence a broken deployment: without place_text_idx, $text
+        # queries fail on the primed first fetch in list_places and return
+        # 500s, so search breakage stays visible beyond this one warning.
+        logger.warning("Could not create indexes, continuing without them: %s", e)
+
+# Wildcard origins with credentials are invalid per the CORS spec and stop
+# browsers from caching preflights. Set ALLOWED_ORIGINS (comma-separated) to
+# enable credentialed requests from known frontends; the wildcard fallback
+# stays spec-compliant by disabling credentials.
+_ALLOWED_ORIGINS = [o for o in os.getenv("ALLOWED_ORIGINS", "").split(",") if o]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=_ALLOWED_ORIGINS or ["*"],
+    allow_credentials=bool(_ALLOWED_ORIGINS),
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,
 )
 
 @app.get("/")
 def read_root():
     return {"message": "Germany Tourist Places API"}
 
-@app.get("/schema")
-def get_schema():
-    return {
-        "place": {
-            "fields": {
-                "name": "string",
-                "city": "string?",
-                "state": "string?",
-                "description": "string?",
-                "category": "string?",
-                "tags": "string[]?",
-                "latitude": "float?",
-                "longitude": "float?",
-                "website": "string?"
-            }
+# The schema payload is immutable, so serialize it once at import time
+_SCHEMA_BYTES = orjson.dumps({
+    "place": {
+        "fields": {
+            "name": "string",
+            "city": "string?",
+            "state": "string?",
+            "description": "string?",
+            "category": "string?",
+            "tags": "string[]?",
+            "latitude": "float?",
+            "longitude": "float?",
+            "website": "string?"
         }
     }
+})
+_SCHEMA_ETAG = f'"{hashlib.blake2b(_SCHEMA_BYTES, digest_size=8).hexdigest()}"'
+
+@app.get("/schema")
+def get_schema():
+    return Response(content=_SCHEMA_BYTES, media_type="application/json",
+                    headers={"ETag": _SCHEMA_ETAG})
 
 class PlaceCreate(Place):
     pass
 
+@lru_cache(maxsize=256)
+def _wildcard_or_clauses(term: str) -> tuple:
+    """Build the $or regex clauses for leading-wildcard fallback queries.
+
+    The term is re.escape()d so user input can't inject regex syntax or
+    trigger pathological backtracking, which keeps matching linear-time.
+    Memoized so repeated queries reuse the prebuilt clauses.
+    """
+    pattern = {"$regex": re.escape(term), "$options": "i"}
+    return (
+        {"name": pattern},
+        {"city": pattern},
+        {"state": pattern},
+        {"category": pattern},
+        {"tags": {"$elemMatch": pattern}},
+    )
+
 @app.post("/places")
-def create_place(place: PlaceCreate):
+async def create_place(place: PlaceCreate):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
-    inserted_id = create_document("place", place)
+    # model_dump goes through the pydantic-core fast path; exclude_unset keeps
+    # omitted optional fields out of the stored document
+    inserted_id = await create_document("place", place.model_dump(exclude_unset=True))
     return {"id": inserted_id}
 
 @app.post("/places/seed")
-def seed_places():
+async def seed_places():
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
-    # If already seeded, do nothing
-    existing = db["place"].count_documents({})
+    # If already seeded, do nothing. The estimated count reads collection
+    # metadata instead of scanning documents, which is all this guard needs.
+    existing = await db["place"].estimated_document_count()
     if existing > 0:
         return {"seeded": False, "message": "Places already exist", "count": existing}
 
-    sample: List[dict] = [
-        {
-            "name": "Brandenburg Gate",
-            "city": "Berlin",
-            "state": "Berlin",
-            "category": "landmark",
-            "description": "18th-century neoclassical monument and iconic symbol of Berlin.",
-            "tags": ["history", "architecture", "city"],
-            "latitude": 52.516275, "longitude": 13.377704,
-            "website": "https://www.visitberlin.de/en/brandenburg-gate"
-        },
-        {
-            "name": "Neuschwanstein Castle",
-            "city": "Schwangau",
-            "state": "Bavaria",
-            "category": "castle",
-            "description": "Fairy-tale 19th-century Romanesque Revival castle commissioned by King Ludwig II.",
-            "tags": ["castle", "mountains", "romantic road"],
-            "latitude": 47.5576, "longitude": 10.7498,
-            "website": "https://www.neuschwanstein.de/englisch/tourist/index.htm"
-        },
-        {
-            "name": "Cologne Cathedral",
-            "city": "Cologne",
-            "state": "North Rhine-Westphalia",
-            "category": "cathedral",
-            "description": "UNESCO-listed Gothic cathedral with twin spires and a rich history.",
-            "tags": ["unesco", "gothic", "church"],
-            "latitude": 50.9413, "longitude": 6.9583,
-            "website": "https://www.koelner-dom.de/"
-        },
-        {
-            "name": "Miniatur Wunderland",
-            "city": "Hamburg",
-            "state": "Hamburg",
-            "category": "museum",
-            "description": "World's largest model railway exhibition with intricate miniature worlds.",
-            "tags": ["museum", "family", "model"],
-            "latitude": 53.5437, "longitude": 9.9884,
-            "website": "https://www.miniatur-wunderland.com/"
-        },
-        {
-            "name": "Black Forest",
-            "city": "",
-            "state": "Baden-Württemberg",
-            "category": "nature",
-            "description": "Mountainous region known for dense forests, cuckoo clocks, and scenic trails.",
-            "tags": ["hiking", "nature", "scenic"],
-            "latitude": 48.1430, "longitude": 8.2096,
-            "website": "https://www.schwarzwald-tourismus.info/"
-        },
-        {
-            "name": "Heidelberg Castle",
-            "city": "Heidelberg",
-            "state": "Baden-Württemberg",
-            "category": "castle",
-            "description": "Picturesque Renaissance castle ruins overlooking the old town.",
-            "tags": ["castle", "ruins", "river"],
-            "latitude": 49.4106, "longitude": 8.7153,
-            "website": "https://www.schloss-heidelberg.de/"
-        },
-        {
-            "name": "Zugspitze",
-            "city": "Garmisch-Partenkirchen",
-            "state": "Bavaria",
-            "category": "mountain",
-            "description": "Germany's highest peak with panoramic views and year-round activities.",
-            "tags": ["alps", "skiing", "views"],
-            "latitude": 47.4210, "longitude": 10.9840,
-            "website": "https://zugspitze.de/"
-        },
-        {
-            "name": "Museum Island",
-            "city": "Berlin",
-            "state": "Berlin",
-            "category": "museum",
-            "description": "UNESCO ensemble of five world-renowned museums on the Spree.",
-            "tags": ["unesco", "art", "history"],
-            "latitude": 52.5211, "longitude": 13.3969,
-            "website": "https://www.smb.museum/en/museums-institutions/museum-island-berlin/home/"
-        },
-        {
-            "name": "Sanssouci Palace",
-            "city": "Potsdam",
-            "state": "Brandenburg",
-            "category": "palace",
-            "description": "Rococo summer palace of Frederick the Great with terraced gardens.",
-            "tags": ["palace", "gardens", "rococo"],
-            "latitude": 52.4036, "longitude": 13.0397,
-            "website": "https://www.spsg.de/"
-        },
-        {
-            "name": "Saxon Switzerland National Park",
-            "city": "",
-            "state": "Saxony",
-            "category": "nature",
-            "description": "Dramatic sandstone formations and hiking trails along the Elbe.",
-            "tags": ["national park", "hiking", "sandstone"],
-            "latitude": 50.9289, "longitude": 14.2366,
-            "website": "https://www.saechsische-schweiz.de/en/"
-        }
-    ]
-
-    ids = []
-    for doc in sample:
-        ids.append(create_document("place", doc))
+    ids = await create_documents("place", _SAMPLE_PLACES)
     return {"seeded": True, "count": len(ids), "ids": ids}
 
 @app.get("/places")
-def list_places(
+async def list_places(
     q: Optional[str] = Query(default=None, description="Search query across name, city, state, category, tags"),
     category: Optional[str] = Query(default=None),
     state: Optional[str] = Query(default=None),
@@ -177,47 +318,103 @@ def list_places(
         raise HTTPException(status_code=500, detail="Database not configured")
 
     filter_dict = {}
+    text_search = False
     if q:
-        filter_dict["$or"] = [
-            {"name": {"$regex": q, "$options": "i"}},
-            {"city": {"$regex": q, "$options": "i"}},
-            {"state": {"$regex": q, "$options": "i"}},
-            {"category": {"$regex": q, "$options": "i"}},
-            {"tags": {"$elemMatch": {"$regex": q, "$options": "i"}}},
-        ]
-    if category:
-        filter_dict["category"] = {"$regex": f"^{category}$", "$options": "i"}
-    if state:
-        filter_dict["state"] = {"$regex": f"^{state}$", "$options": "i"}
-    if city:
-        filter_dict["city"] = {"$regex": f"^{city}$", "$options": "i"}
-
-    docs = get_documents("place", filter_dict, limit)
-
-    cleaned = []
-    for d in docs:
-        d["id"] = str(d.pop("_id", ""))
-        cleaned.append(d)
-    return {"items": cleaned, "count": len(cleaned)}
+        if q.startswith("*"):
+            # Leading-wildcard queries can't use the text index; fall back to regex
+            filter_dict["$or"] = _wildcard_or_clauses(q.lstrip("*"))
+        else:
+            filter_dict["$text"] = {"$search": q}
+            text_search = True
+    # The $text path skips the query-time collation (Mongo rejects the
+    # combination), so exact filters there fall back to an anchored, escaped
+    # "i" regex to stay case-insensitive; the text index has already narrowed
+    # the candidate set, so the regex only runs on matches
+    for field, value in (("category", category), ("state", state), ("city", city)):
+        if value:
+            if text_search:
+                filter_dict[field] = {"$regex": f"^{re.escape(value)}$", "$options": "i"}
+            else:
+                filter_dict[field] = value
+
+    # Shape documents server-side: stringify _id as "id" in the pipeline so
+    # no per-document Python loop is needed on the result
+    pipeline = [{"$match": filter_dict}]
+    if text_search:
+        pipeline.append({"$sort": {"score": {"$meta": "textScore"}}})
+    pipeline += [
+        {"$limit": limit},
+        # Explicit projection: only the API fields cross the wire, with _id
+        # already stringified as "id"
+        {"$project": {
+            "_id": 0,
+            "id": {"$toString": "$_id"},
+            "name": 1, "city": 1, "state": 1, "category": 1, "description": 1,
+            "tags": 1, "latitude": 1, "longitude": 1, "website": 1,
+        }},
+    ]
+
+    # $text doesn't support a query-time collation override
+    collation = None if text_search else CASE_INSENSITIVE
+    cursor = aggregate_cursor("place", pipeline, collation=collation)
+
+    # The cursor is lazy, so prime it before committing to a 200: server
+    # selection, auth, bad pipelines, and missing-index errors all fail on
+    # this first fetch and must surface as a 500, not an empty success body
+    try:
+        first = await anext(cursor)
+    except StopAsyncIteration:
+        first = None
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
+
+    # Stream the remaining documents as they arrive instead of buffering the
+    # whole result, keeping peak memory flat and improving time-to-first-byte
+    async def stream():
+        count = 0
+        yield b'{"items":['
+        if first is not None:
+            yield orjson.dumps(first, default=_orjson_default)
+            count = 1
+            try:
+                async for doc in cursor:
+                    yield b","
+                    yield orjson.dumps(doc, default=_orjson_default)
+                    count += 1
+            except Exception:
+                # Genuinely mid-stream failure: the 200 status line is
+                # already out, so log it and close the JSON cleanly with
+                # whatever was sent rather than cutting the body short
+                logger.exception("aggregation failed while streaming /places")
+        yield b'],"count":%d}' % count
+
+    return StreamingResponse(stream(), media_type="application/json")
+
+# Environment is immutable after process start, so resolve it once here
+# instead of hitting os.environ on every /test request
+_HAS_DB_URL = bool(os.getenv("DATABASE_URL"))
+_HAS_DB_NAME = bool(os.getenv("DATABASE_NAME"))
+_PORT = int(os.getenv("PORT", 8000))
+
+_TEST_RESPONSE_BASE = {
+    "backend": "✅ Running",
+    "database": "❌ Not Available",
+    "database_url": "✅ Set" if _HAS_DB_URL else "❌ Not Set",
+    "database_name": "✅ Set" if _HAS_DB_NAME else "❌ Not Set",
+    "connection_status": "Not Connected",
+    "collections": []
+}
 
 @app.get("/test")
-def test_database():
-    response = {
-        "backend": "✅ Running",
-        "database": "❌ Not Available",
-        "database_url": None,
-        "database_name": None,
-        "connection_status": "Not Connected",
-        "collections": []
-    }
+async def test_database():
+    # Fresh "collections" list per request so the template's can't be mutated
+    response = {**_TEST_RESPONSE_BASE, "collections": []}
     try:
         if db is not None:
             response["database"] = "✅ Available"
-            response["database_url"] = "✅ Configured"
-            response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                collections = await db.list_collection_names()
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
@@ -227,11 +424,10 @@ def test_database():
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:50]}"
 
-    response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
     return response
 
 if __name__ == "__main__":
     import uvicorn
-    port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    port = _PORT
+    # Single-worker dev entry point; production uses gunicorn (start_server.sh)
+    uvicorn.run(app, host="0.0.0.0", port=port, loop="uvloop", http="httptools")
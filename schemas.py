@@ -11,7 +11,7 @@ Model name is converted to lowercase for the collection name:
 - BlogPost -> "blogs" collection
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 
 # Example schemas (replace with your own):
@@ -46,6 +46,8 @@ class Place(BaseModel):
     Tourist places in Germany
     Collection name: "place"
     """
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
     name: str = Field(..., description="Place name")
     city: Optional[str] = Field(None, description="City or locality")
     state: Optional[str] = Field(None, description="Federal state (Bundesland)")